@@ -8,24 +8,172 @@ feedback loops for precision.
 """
 import time
 import math
+import queue
+import socket
+import sys
+import threading
 from pymavlink import mavutil
 
+# Receive buffer for UDP links, so bursts are not dropped between reads
+UDP_RECV_BUFFER = 1 << 20
+
+# Setpoint streaming period (20 Hz); ArduPilot drops targets older than ~1s
+SETPOINT_PERIOD = 0.05
+
 
 class DroneController:
     def __init__(self, connection_string='udp:127.0.0.1:14550'):
         """Initialize connection to drone"""
         print(f"[CONNECT] Connecting to drone at {connection_string}...")
         self.master = mavutil.mavlink_connection(connection_string)
-        self.master.wait_heartbeat()
+        self._tune_link()
+        heartbeat = self.master.wait_heartbeat()
+        while heartbeat.type == mavutil.mavlink.MAV_TYPE_GCS:
+            heartbeat = self.master.wait_heartbeat()
         print("[SUCCESS] Heartbeat received from drone")
 
+        # pymavlink only records the vehicle's system id (target_component
+        # stays 0), so remember which component the autopilot speaks from
+        self._autopilot_component = heartbeat.get_srcComponent()
+
+        # A single background pump reads the link; wait routines take
+        # messages from per-type queues instead of calling recv_match
+        self._queues = {}
+        self._queues_lock = threading.Lock()
+        self._pump_error = None
+        self._running = True
+        self._pump_thread = threading.Thread(target=self._mavlink_pump, daemon=True)
+        self._pump_thread.start()
+
+    def _tune_link(self):
+        """Configure the underlying transport for low command latency
+
+        Serial: set ASYNC_LOW_LATENCY so USB-serial adapters flush every
+        byte instead of batching on their 16 ms latency timer (Linux only).
+        UDP: enlarge the receive buffer. TCP needs nothing here, as
+        pymavlink already sets TCP_NODELAY on its TCP links.
+        """
+        try:
+            if isinstance(self.master, mavutil.mavserial):
+                self.master.port.set_low_latency_mode(True)
+            elif isinstance(self.master, mavutil.mavudp):
+                sock = self.master.port
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RECV_BUFFER)
+                # Linux silently caps the size at net.core.rmem_max, and
+                # reports back double the granted size (bookkeeping overhead)
+                actual = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+                if sys.platform.startswith('linux'):
+                    actual //= 2
+                if actual < UDP_RECV_BUFFER:
+                    print(f"[WARNING] UDP receive buffer capped at {actual} bytes "
+                          f"(requested {UDP_RECV_BUFFER}); raise net.core.rmem_max")
+        except (AttributeError, OSError, ValueError) as e:
+            print(f"[WARNING] Could not apply low-latency link settings: {e}")
+
+    def close(self):
+        """Stop the message pump; it closes the MAVLink connection on exit
+
+        Does not wait for the pump, so it is safe to call from the GUI thread.
+        """
+        self._running = False
+
+    def _queue(self, msg_type):
+        """Get (or create) the queue holding the latest message of a type"""
+        with self._queues_lock:
+            q = self._queues.get(msg_type)
+            if q is None:
+                q = self._queues[msg_type] = queue.Queue(maxsize=1)
+            return q
+
+    def _mavlink_pump(self):
+        """Read every incoming message once and dispatch it by type
+
+        Each queue holds only the newest message, so a reader always gets
+        current data and unread message types do not pile up.
+        """
+        try:
+            self._pump_messages()
+        finally:
+            self.master.close()
+
+    def _pump_messages(self):
+        while self._running:
+            try:
+                msg = self.master.recv_match(blocking=True, timeout=1)
+            except Exception as e:
+                if self._running:
+                    print(f"[ERROR] MAVLink receive failed: {e}")
+                    self._pump_error = e
+                return
+
+            if msg is None or msg.get_type() == 'BAD_DATA':
+                continue
+            # Ignore traffic from other systems (e.g. the GCS heartbeat)
+            if msg.get_srcSystem() != self.master.target_system:
+                continue
+            # Only the autopilot's heartbeat carries its mode and arm state;
+            # a camera or gimbal heartbeat must not replace it in the slot
+            if (msg.get_type() == 'HEARTBEAT'
+                    and msg.get_srcComponent() != self._autopilot_component):
+                continue
+
+            q = self._queue(msg.get_type())
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+            # Only the pump puts, so the queue always has room here
+            q.put_nowait(msg)
+
+    def _recv(self, msg_type, timeout=1):
+        """Take the newest unread message of a type, waiting if none yet
+
+        Returns:
+            The message, or None on timeout
+
+        Raises:
+            ConnectionError: if the link was closed or the pump failed
+        """
+        self._check_link()
+        try:
+            return self._queue(msg_type).get(timeout=timeout)
+        except queue.Empty:
+            self._check_link()
+            return None
+
+    def _check_link(self):
+        """Raise if the message pump is no longer receiving"""
+        if self._pump_error is not None:
+            raise ConnectionError(
+                f"MAVLink receive failed: {self._pump_error}") from self._pump_error
+        if not self._running:
+            raise ConnectionError("MAVLink connection closed")
+
+    def _stream_setpoint(self, setpoint, stop_event):
+        """Send a setpoint at a fixed rate until stop_event is set"""
+        next_send = time.monotonic()
+        while not stop_event.is_set():
+            try:
+                self.master.mav.send(setpoint)
+            except Exception as e:
+                if self._running:
+                    print(f"[ERROR] Setpoint stream stopped: {e}")
+                return
+
+            next_send += SETPOINT_PERIOD
+            now = time.monotonic()
+            if next_send < now:
+                # Fell behind after a stall: re-anchor rather than burst
+                next_send = now + SETPOINT_PERIOD
+            stop_event.wait(next_send - now)
+
     def get_location(self):
         """Get current GPS location
 
         Returns:
             dict with lat, lon, alt, relative_alt or None if unavailable
         """
-        msg = self.master.recv_match(type='GLOBAL_POSITION_INT', blocking=True, timeout=1)
+        msg = self._recv('GLOBAL_POSITION_INT', timeout=1)
         if msg:
             return {
                 'lat': msg.lat / 1e7,
@@ -41,7 +189,7 @@ class DroneController:
         Returns:
             dict with x, y, z (NED meters) or None
         """
-        msg = self.master.recv_match(type='LOCAL_POSITION_NED', blocking=True, timeout=2)
+        msg = self._recv('LOCAL_POSITION_NED', timeout=2)
         if msg:
             return {'x': msg.x, 'y': msg.y, 'z': msg.z}
         return None
@@ -52,7 +200,7 @@ class DroneController:
         Returns:
             dict with fix_type and satellites, or None if unavailable
         """
-        msg = self.master.recv_match(type='GPS_RAW_INT', blocking=True, timeout=1)
+        msg = self._recv('GPS_RAW_INT', timeout=1)
         if msg:
             return {
                 'fix_type': msg.fix_type,
@@ -64,13 +212,18 @@ class DroneController:
         """Wait for GPS lock"""
         print("[GPS] Waiting for GPS lock...")
         start_time = time.time()
+        last_status = None
 
         while time.time() - start_time < timeout:
-            msg = self.master.recv_match(type='GPS_RAW_INT', blocking=True, timeout=1)
+            msg = self._recv('GPS_RAW_INT', timeout=1)
             if msg:
                 fix_type = msg.fix_type
                 satellites = msg.satellites_visible
-                print(f"[GPS] Fix type={fix_type}, Satellites={satellites}")
+
+                # Print only when the fix status changes, not per message
+                if (fix_type, satellites) != last_status:
+                    print(f"[GPS] Fix type={fix_type}, Satellites={satellites}")
+                    last_status = (fix_type, satellites)
 
                 if fix_type >= 3 and satellites >= 6:
                     print("[SUCCESS] GPS lock acquired!")
@@ -79,8 +232,16 @@ class DroneController:
         print("[ERROR] GPS lock timeout")
         return False
 
-    def set_mode(self, mode):
-        """Set flight mode"""
+    def set_mode(self, mode, timeout=10):
+        """Set flight mode
+
+        Args:
+            mode: Mode name (STABILIZE, GUIDED, LAND, RTL, LOITER)
+            timeout: Seconds to wait for the vehicle to confirm (default 10)
+
+        Returns:
+            True once a heartbeat reports the requested mode
+        """
         print(f"[MODE] Setting mode to {mode}...")
 
         mode_mapping = {
@@ -101,9 +262,16 @@ class DroneController:
             mode_mapping[mode]
         )
 
-        time.sleep(2)
-        print(f"[SUCCESS] Mode set to {mode}")
-        return True
+        # Wait for the vehicle to report the new mode instead of a fixed delay
+        start_time = time.time()
+        while time.time() - start_time < timeout:
+            msg = self._recv('HEARTBEAT', timeout=1)
+            if msg and msg.custom_mode == mode_mapping[mode]:
+                print(f"[SUCCESS] Mode set to {mode}")
+                return True
+
+        print(f"[ERROR] Mode change to {mode} not confirmed")
+        return False
 
     def arm(self, retries=5, retry_delay=5):
         """Arm the drone, retrying on failure
@@ -128,7 +296,7 @@ class DroneController:
 
             start_time = time.time()
             while time.time() - start_time < 10:
-                msg = self.master.recv_match(type='HEARTBEAT', blocking=True, timeout=1)
+                msg = self._recv('HEARTBEAT', timeout=1)
                 if msg:
                     if msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED:
                         print("[SUCCESS] Armed!")
@@ -156,27 +324,35 @@ class DroneController:
         start_time = time.time()
         stable_count = 0
         last_alt = 0
+        last_sample = 0
 
         while time.time() - start_time < 30:
-            msg = self.master.recv_match(type='GLOBAL_POSITION_INT', blocking=True, timeout=1)
-            if msg:
-                current_alt = msg.relative_alt / 1000.0
-                print(f"[TAKEOFF] Altitude: {current_alt:.1f}m / {altitude}m")
-
-                if current_alt >= altitude * 0.90:
-                    print(f"[SUCCESS] Reached target altitude!")
+            msg = self._recv('GLOBAL_POSITION_INT', timeout=1)
+            if not msg:
+                continue
+
+            current_alt = msg.relative_alt / 1000.0
+            if current_alt >= altitude * 0.90:
+                print(f"[SUCCESS] Reached target altitude!")
+                return True
+
+            # Sample stability once per second without sleeping, so the
+            # receive buffer keeps draining and readings stay current
+            now = time.time()
+            if now - last_sample < 1:
+                continue
+            last_sample = now
+
+            print(f"[TAKEOFF] Altitude: {current_alt:.1f}m / {altitude}m")
+            if abs(current_alt - last_alt) < 0.1:
+                stable_count += 1
+                if stable_count >= 3 and current_alt >= altitude * 0.85:
+                    print(f"[SUCCESS] Altitude stabilized at {current_alt:.1f}m")
                     return True
+            else:
+                stable_count = 0
 
-                if abs(current_alt - last_alt) < 0.1:
-                    stable_count += 1
-                    if stable_count >= 3 and current_alt >= altitude * 0.85:
-                        print(f"[SUCCESS] Altitude stabilized at {current_alt:.1f}m")
-                        return True
-                else:
-                    stable_count = 0
-
-                last_alt = current_alt
-            time.sleep(1)
+            last_alt = current_alt
 
         print("[ERROR] Takeoff timeout")
         return False
@@ -236,58 +412,50 @@ class DroneController:
         #   bits 3-10:     1 = ignore (velocity, accel, yaw, yaw_rate)
         type_mask = 0b0000111111111000
 
-        self.master.mav.send(
-            mavutil.mavlink.MAVLink_set_position_target_local_ned_message(
-                10,                                        # time_boot_ms
-                self.master.target_system,
-                self.master.target_component,
-                mavutil.mavlink.MAV_FRAME_LOCAL_NED,       # World frame
-                type_mask,
-                target_x, target_y, target_z,              # Position
-                0, 0, 0,                                   # Velocity (ignored)
-                0, 0, 0,                                   # Acceleration (ignored)
-                0, 0                                       # Yaw, yaw_rate (ignored)
-            )
+        # Build the setpoint once; mav.send() re-packs it with a fresh
+        # sequence number on every send of the stream below.
+        setpoint = mavutil.mavlink.MAVLink_set_position_target_local_ned_message(
+            10,                                        # time_boot_ms
+            self.master.target_system,
+            self.master.target_component,
+            mavutil.mavlink.MAV_FRAME_LOCAL_NED,       # World frame
+            type_mask,
+            target_x, target_y, target_z,              # Position
+            0, 0, 0,                                   # Velocity (ignored)
+            0, 0, 0,                                   # Acceleration (ignored)
+            0, 0                                       # Yaw, yaw_rate (ignored)
         )
 
+        # Stream the target at a fixed rate to keep autopilot tracking
+        stop_stream = threading.Event()
+        threading.Thread(target=self._stream_setpoint,
+                         args=(setpoint, stop_stream), daemon=True).start()
+
         # Wait until drone reaches target (with feedback)
         tolerance = 1.0  # meters
         timeout = max(distance / speed * 3, 15)  # generous timeout
         start_time = time.time()
         last_print = 0
 
-        while time.time() - start_time < timeout:
-            pos = self._get_local_position()
-            if pos:
-                dx = target_x - pos['x']
-                dy = target_y - pos['y']
-                remaining = math.sqrt(dx**2 + dy**2)
-
-                # Print progress every 2 seconds
-                now = time.time()
-                if now - last_print >= 2:
-                    print(f"[MOVE] Remaining: {remaining:.1f}m")
-                    last_print = now
-
-                if remaining < tolerance:
-                    print(f"[SUCCESS] Reached target (error: {remaining:.2f}m)")
-                    return True
-
-            # Re-send target periodically to keep autopilot tracking
-            self.master.mav.send(
-                mavutil.mavlink.MAVLink_set_position_target_local_ned_message(
-                    10,
-                    self.master.target_system,
-                    self.master.target_component,
-                    mavutil.mavlink.MAV_FRAME_LOCAL_NED,
-                    type_mask,
-                    target_x, target_y, target_z,
-                    0, 0, 0,
-                    0, 0, 0,
-                    0, 0
-                )
-            )
-            time.sleep(0.5)
+        try:
+            while time.time() - start_time < timeout:
+                pos = self._get_local_position()
+                if pos:
+                    dx = target_x - pos['x']
+                    dy = target_y - pos['y']
+                    remaining = math.sqrt(dx**2 + dy**2)
+
+                    # Print progress every 2 seconds
+                    now = time.time()
+                    if now - last_print >= 2:
+                        print(f"[MOVE] Remaining: {remaining:.1f}m")
+                        last_print = now
+
+                    if remaining < tolerance:
+                        print(f"[SUCCESS] Reached target (error: {remaining:.2f}m)")
+                        return True
+        finally:
+            stop_stream.set()
 
         print(f"[ERROR] Move timeout after {timeout:.0f}s")
         return False
@@ -298,9 +466,8 @@ class DroneController:
         self.set_mode('LAND')
 
         while True:
-            msg = self.master.recv_match(type='HEARTBEAT', blocking=True, timeout=1)
+            msg = self._recv('HEARTBEAT', timeout=1)
             if msg:
                 if not (msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED):
                     print("[SUCCESS] Landed and disarmed!")
                     return True
-            time.sleep(1)
\ No newline at end of file
@@ -264,7 +264,14 @@ class ControllerTab(ttk.Frame):
             messagebox.showerror("Connection Error", str(e))
             
     def disconnect(self):
+        if self.is_mission_running:
+            messagebox.showwarning("Running",
+                "Wait for the mission to finish before disconnecting")
+            return
+
         self.gps_update_active = False
+        if self.drone_controller:
+            self.drone_controller.close()
         self.drone_controller = None
         self.is_connected = False
         self.connect_button.config(text="Connect")
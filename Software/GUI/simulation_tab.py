@@ -475,6 +475,8 @@ class SimulationTab(ttk.Frame):
         finally:
             self.is_running = False
             self.abort_requested = False
+            if self.drone_controller:
+                self.drone_controller.close()
             self.drone_controller = None
 
             # Always clean up SITL if still running